@@ -3,10 +3,18 @@ import pandas as pd
 from datetime import datetime
 import re
 import io
+import html
+import heapq
 import base64
-from typing import List, Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Tuple, Pattern, Iterable
 import PyPDF2
+import pypdfium2 as pdfium
 import docx
+import ahocorasick
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from openpyxl import Workbook
 from openpyxl.styles import Font, Fill, PatternFill, Alignment
 from openpyxl.utils.dataframe import dataframe_to_rows
@@ -68,6 +76,14 @@ if 'analysis_results' not in st.session_state:
 if 'custom_terms' not in st.session_state:
     st.session_state.custom_terms = []
 
+def lowercase_pattern(pattern: str) -> str:
+    """Lowercase the literal text of a regex, leaving escapes such as \\S or \\D intact.
+
+    Documents are lowercased once before scanning, so every pattern is compiled
+    in lowercase instead of with re.IGNORECASE.
+    """
+    return re.sub(r'\\.|[^\\]+', lambda part: part.group(0) if part.group(0)[0] == '\\' else part.group(0).lower(), pattern)
+
 # Risk keywords and patterns
 RISK_PATTERNS = {
     'high': {
@@ -91,6 +107,10 @@ RISK_PATTERNS = {
         'change_orders': r'change\s+order|modification|amendment',
     }
 }
+RISK_PATTERNS = {
+    level: {key: re.compile(lowercase_pattern(pattern)) for key, pattern in patterns.items()}
+    for level, patterns in RISK_PATTERNS.items()
+}
 
 # Federal-specific patterns
 FEDERAL_PATTERNS = {
@@ -100,6 +120,7 @@ FEDERAL_PATTERNS = {
     'security_clearance': r'security\s+clearance|classified|secret|confidential',
     'buy_american': r'Buy\s+American|domestic\s+end\s+product|TAA\s+compliant',
 }
+FEDERAL_PATTERNS = {key: re.compile(lowercase_pattern(pattern)) for key, pattern in FEDERAL_PATTERNS.items()}
 
 # Instruction patterns
 INSTRUCTION_PATTERNS = {
@@ -109,77 +130,309 @@ INSTRUCTION_PATTERNS = {
     'required_docs': r'required\s+document|must\s+include|shall\s+provide|attachment|exhibit',
     'evaluation': r'evaluation\s+criteria|scoring|weight|technical\s+approach|past\s+performance',
 }
+INSTRUCTION_PATTERNS = {key: re.compile(lowercase_pattern(pattern)) for key, pattern in INSTRUCTION_PATTERNS.items()}
+
+# Built-in categories by regex group name: (results section, risk level, category key, pattern)
+CATEGORY_GROUPS = {}
+for key, pattern in INSTRUCTION_PATTERNS.items():
+    CATEGORY_GROUPS[f'instructions__{key}'] = ('instructions', None, key, pattern)
+for level, patterns in RISK_PATTERNS.items():
+    for key, pattern in patterns.items():
+        CATEGORY_GROUPS[f'risks_{level}__{key}'] = ('risks', level, key, pattern)
+for key, pattern in FEDERAL_PATTERNS.items():
+    CATEGORY_GROUPS[f'federal_items__{key}'] = ('federal_items', None, key, pattern)
+
+def split_alternatives(pattern: str) -> List[str]:
+    """Split a regex into its top-level alternatives"""
+    alternatives = []
+    current = ''
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            current += pattern[i:i + 2]
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            alternatives.append(current)
+            current = ''
+            i += 1
+            continue
+        current += char
+        i += 1
+    alternatives.append(current)
+    return alternatives
+
+def literal_prefix(alternative: str) -> str:
+    """Get the literal text a regex alternative always starts with"""
+    prefix = ''
+    i = 0
+    while i < len(alternative):
+        char = alternative[i]
+        step = 1
+        if char == '\\':
+            char = alternative[i + 1:i + 2]
+            step = 2
+            if char.isalnum():  # \s, \d, \b etc. are not literals
+                break
+        elif char in '.^$*+?{}[]()|':
+            break
+        # A quantifier makes this character optional or repeated
+        if alternative[i + step:i + step + 1] in ('?', '*', '+', '{'):
+            break
+        prefix += char
+        i += step
+    return prefix
+
+# Built-in category groups by the lowercased literal one of their
+# alternatives starts with
+CATEGORY_LITERALS = {}
+for group, (_, _, _, pattern) in CATEGORY_GROUPS.items():
+    for alternative in split_alternatives(pattern.pattern):
+        literal = literal_prefix(alternative).lower()
+        if not literal:
+            raise ValueError(f"Pattern alternative has no literal prefix: {alternative}")
+        groups = CATEGORY_LITERALS.setdefault(literal, [])
+        if group not in groups:
+            groups.append(group)
+
+# Aho-Corasick automaton over those literals: one pass over the lowercased
+# document finds every position a category can match at, and only those
+# positions are confirmed with the category's regex
+CATEGORY_AUTOMATON = ahocorasick.Automaton()
+for literal, groups in CATEGORY_LITERALS.items():
+    CATEGORY_AUTOMATON.add_word(literal, (len(literal), groups))
+CATEGORY_AUTOMATON.make_automaton()
+CATEGORY_MAX_LITERAL = max(len(literal) for literal in CATEGORY_LITERALS)
+
+# Date formats used to locate deadlines, scanned as one alternation
+DATE_PATTERN = re.compile(lowercase_pattern('|'.join([
+    r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
+    r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
+    r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{2,4}\b',
+])))
+
+# Words that mark a date's context as a deadline, matched as substrings with one
+# search of the lowercased text. This also catches "submitted", "closed" and
+# "closes", at the cost of false positives such as "by" in "hereby" or "maybe"
+DEADLINE_WORD_PATTERN = re.compile(r'due|deadline|submit|close|by')
+
+# Words are counted by scanning for them rather than splitting the text into a list
+WORD_PATTERN = re.compile(r'\S+')
+
+# Files are extracted in worker threads; serialize their error messages
+ERROR_LOCK = threading.Lock()
+# PDFium is not thread-safe, so only one worker may use it at a time; this
+# serializes PDF extraction across the thread pool
+PDFIUM_LOCK = threading.Lock()
 
 def extract_text_from_pdf(file) -> str:
     """Extract text from PDF file"""
+    try:
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(file.read())
+            try:
+                pages = [pdf[i].get_textpage().get_text_range() for i in range(len(pdf))]
+            finally:
+                pdf.close()
+        return "".join(page.replace("\r\n", "\n") + "\n" for page in pages)
+    except pdfium.PdfiumError:
+        # Fall back to PyPDF2 for files PDFium rejects
+        file.seek(0)
     try:
         pdf_reader = PyPDF2.PdfReader(file)
-        text = ""
+        parts = []
         for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+            parts.append((page.extract_text() or "") + "\n")
+        return "".join(parts)
     except Exception as e:
-        st.error(f"Error reading PDF: {str(e)}")
+        with ERROR_LOCK:
+            st.error(f"Error reading PDF: {str(e)}")
         return ""
 
 def extract_text_from_docx(file) -> str:
     """Extract text from DOCX file"""
     try:
         doc = docx.Document(file)
-        text = ""
+        parts = []
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+            parts.append(paragraph.text + "\n")
         # Also extract text from tables
         for table in doc.tables:
             for row in table.rows:
                 for cell in row.cells:
-                    text += cell.text + "\t"
-                text += "\n"
-        return text
+                    parts.append(cell.text + "\t")
+                parts.append("\n")
+        return "".join(parts)
     except Exception as e:
-        st.error(f"Error reading DOCX: {str(e)}")
+        with ERROR_LOCK:
+            st.error(f"Error reading DOCX: {str(e)}")
         return ""
 
-def find_matches(text: str, patterns: Dict[str, str]) -> Dict[str, List[str]]:
-    """Find pattern matches in text"""
+@st.cache_data(show_spinner=False, max_entries=32)
+def extract_text(data: bytes, file_type: str) -> str:
+    """Extract text from an uploaded PDF or DOCX file, cached on its contents"""
+    file = io.BytesIO(data)
+    if file_type == "application/pdf":
+        return extract_text_from_pdf(file)
+    return extract_text_from_docx(file)  # DOCX
+
+def context_bounds(text: str, start: int, end: int, width: int = 100) -> Tuple[int, int]:
+    """Get the bounds of the text surrounding a match, without crossing line breaks"""
+    context_start = max(0, start - width)
+    line_break = text.rfind('\n', context_start, start)
+    if line_break != -1:
+        context_start = line_break + 1
+    context_end = text.find('\n', end, end + width)
+    if context_end == -1:
+        context_end = end + width
+    return context_start, context_end
+
+def get_context(text: str, start: int, end: int, width: int = 100) -> str:
+    """Get the text surrounding a match, without crossing line breaks"""
+    context_start, context_end = context_bounds(text, start, end, width)
+    return text[context_start:context_end].strip()
+
+def find_matches(text: str, patterns: Dict[str, Pattern], seen: Dict[str, set] = None,
+                 text_lower: str = None) -> Dict[str, List[str]]:
+    """Find lowercase pattern matches in text, skipping matches already in seen"""
+    if seen is None:
+        seen = {}
+    if text_lower is None:
+        text_lower = lower_aligned(text)
     matches = {}
     for key, pattern in patterns.items():
-        found = re.findall(pattern, text, re.IGNORECASE)
-        if found:
-            # Get context around matches
-            contexts = []
-            for match in set(found[:5]):  # Limit to 5 examples
-                pattern_with_context = r'.{0,100}' + re.escape(match) + r'.{0,100}'
-                context_matches = re.findall(pattern_with_context, text, re.IGNORECASE)
-                if context_matches:
-                    contexts.append(context_matches[0].strip())
+        contexts = []
+        key_seen = seen.setdefault(key, set())
+        if len(key_seen) >= 5:
+            continue
+        # Single pass over the text; context is sliced around each match
+        for match in pattern.finditer(text_lower):
+            found = match.group(0)
+            if found in key_seen:
+                continue
+            key_seen.add(found)
+            contexts.append(get_context(text, match.start(), match.end()))
+            if len(key_seen) >= 5:  # Limit to 5 examples
+                break
+        if contexts:
             matches[key] = contexts
     return matches
 
-def extract_deadlines(text: str) -> List[str]:
-    """Extract potential deadline information"""
+def lower_aligned(text: str) -> str:
+    """Lowercase text without changing its length, so offsets still index the original"""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters (e.g. "\u0130") lowercase to more than one character
+        lowered = ''.join(char.lower()[0] for char in text)
+    return lowered
+
+def iter_category_candidates(text_lower: str) -> Iterable[Tuple[int, List[str]]]:
+    """Yield (start, groups) for each category literal in the text, in start order"""
+    # The automaton reports literals by end position. No literal is longer than
+    # CATEGORY_MAX_LITERAL, so a hit is released once later hits can no longer
+    # start before it, and only a window of hits is held at a time
+    pending = []
+    for end, (length, groups) in CATEGORY_AUTOMATON.iter(text_lower):
+        heapq.heappush(pending, (end - length + 1, groups))
+        while pending[0][0] <= end - CATEGORY_MAX_LITERAL:
+            yield heapq.heappop(pending)
+    while pending:
+        yield heapq.heappop(pending)
+
+def find_category_matches(text: str, seen: Dict[str, set] = None, text_lower: str = None) -> Dict[str, List[str]]:
+    """Find matches for all built-in categories in one pass, keyed by group name, skipping matches already in seen"""
+    if seen is None:
+        seen = {}
+    if text_lower is None:
+        text_lower = lower_aligned(text)
+    for group in CATEGORY_GROUPS:
+        seen.setdefault(group, set())
+    matches = {group: [] for group in CATEGORY_GROUPS}
+    # Categories overlap (e.g. "confidential"), so every candidate position is
+    # checked against each category whose literal was found there, skipping
+    # past that category's previous match as its own finditer would
+    next_start = dict.fromkeys(CATEGORY_GROUPS, 0)
+    open_groups = {group for group in CATEGORY_GROUPS if len(seen[group]) < 5}
+    for start, groups in iter_category_candidates(text_lower):
+        if not open_groups:
+            break
+        for group in groups:
+            if group not in open_groups or start < next_start[group]:
+                continue
+            found = CATEGORY_GROUPS[group][3].match(text_lower, start)
+            if not found:
+                continue
+            next_start[group] = found.end()
+            key = found.group(0)
+            if key in seen[group]:
+                continue
+            seen[group].add(key)
+            matches[group].append(get_context(text, start, found.end()))
+            if len(seen[group]) >= 5:  # Limit to 5 examples
+                open_groups.discard(group)
+    return matches
+
+# Streamlit reruns the script on every interaction, so compiled custom terms
+# are cached; adding one term only compiles that term
+@lru_cache(maxsize=1024)
+def compile_term(term: str):
+    """Compile a custom search term as a literal pattern"""
+    return re.compile(re.escape(term.lower()))
+
+def find_custom_matches(text: str, custom_terms: List[str], seen: Dict[str, set] = None,
+                        text_lower: str = None) -> Dict[str, List[str]]:
+    """Find matches for user-supplied search terms, skipping matches already in seen"""
+    if text_lower is None:
+        text_lower = lower_aligned(text)
+    custom_patterns = {term: compile_term(term) for term in custom_terms}
+    return find_matches(text, custom_patterns, seen, text_lower)
+
+def extract_deadlines(text: str, seen: set = None, text_lower: str = None) -> List[str]:
+    """Extract potential deadline information in document order, skipping deadlines already in seen"""
+    if seen is None:
+        seen = set()
+    if text_lower is None:
+        text_lower = lower_aligned(text)
     deadlines = []
-    # Look for date patterns
-    date_patterns = [
-        r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-        r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
-        r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{2,4}\b',
-    ]
-    
-    for pattern in date_patterns:
-        dates = re.findall(pattern, text, re.IGNORECASE)
-        for date in dates:
-            # Get context around the date
-            context_pattern = r'.{0,50}' + re.escape(date) + r'.{0,50}'
-            contexts = re.findall(context_pattern, text, re.IGNORECASE)
-            for context in contexts:
-                if any(word in context.lower() for word in ['due', 'deadline', 'submit', 'close', 'by']):
-                    deadlines.append(context.strip())
+    if len(seen) >= 10:
+        return deadlines
+    # Look for dates, with the context sliced around each one. A date inside the
+    # previous deadline's context is already shown there, so contexts never
+    # overlap and a date repeated on one line gives a single entry
+    last_end = 0
+    for match in DATE_PATTERN.finditer(text_lower):
+        if match.start() < last_end:
+            continue
+        context_start, context_end = context_bounds(text, match.start(), match.end(), 50)
+        if not DEADLINE_WORD_PATTERN.search(text_lower, context_start, context_end):
+            continue
+        last_end = context_end
+        context = text[context_start:context_end].strip()
+        if context not in seen:
+            seen.add(context)
+            deadlines.append(context)
+            if len(seen) >= 10:  # Unique and limited to 10, so no need to scan further
+                break
     
-    return list(set(deadlines))[:10]  # Return unique, limited to 10
+    return deadlines
 
 def analyze_document(text: str, custom_terms: List[str]) -> Dict:
     """Perform comprehensive document analysis"""
+    return analyze_document_chunks([text], custom_terms)
+
+def analyze_document_chunks(texts: Iterable[str], custom_terms: List[str]) -> Dict:
+    """Perform comprehensive analysis of several documents, one text at a time"""
     results = {
         'instructions': {},
         'risks': {'high': {}, 'medium': {}, 'low': {}},
@@ -188,40 +441,95 @@ def analyze_document(text: str, custom_terms: List[str]) -> Dict:
         'deadlines': [],
         'statistics': {}
     }
+    # Matches are merged across documents; the seen sets carry the
+    # de-duplication and per-category limits from one document to the next
+    category_matches = {group: [] for group in CATEGORY_GROUPS}
+    category_seen = {}
+    custom_matches = {term: [] for term in custom_terms}
+    custom_seen = {}
+    deadlines = []
+    deadline_seen = set()
+    line_count = 0
+    word_count = 0
     
-    # Extract instructions
-    results['instructions'] = find_matches(text, INSTRUCTION_PATTERNS)
-    
-    # Extract deadlines
-    results['deadlines'] = extract_deadlines(text)
-    
-    # Identify risks
-    for risk_level, patterns in RISK_PATTERNS.items():
-        results['risks'][risk_level] = find_matches(text, patterns)
-    
-    # Check for federal-specific items
-    results['federal_items'] = find_matches(text, FEDERAL_PATTERNS)
+    for text in texts:
+        # Lowercase once; patterns run on the lowercased text and contexts
+        # are sliced from the original at the same offsets
+        text_lower = lower_aligned(text)
+        
+        # Extract instructions, risks and federal-specific items in a single pass
+        for group, contexts in find_category_matches(text, category_seen, text_lower).items():
+            category_matches[group].extend(contexts)
+        
+        # Extract deadlines
+        deadlines.extend(extract_deadlines(text, deadline_seen, text_lower))
+        
+        # Search for custom terms
+        if custom_terms:
+            for term, contexts in find_custom_matches(text, custom_terms, custom_seen, text_lower).items():
+                custom_matches[term].extend(contexts)
+        
+        line_count += text.count('\n')
+        word_count += sum(1 for _ in WORD_PATTERN.finditer(text))
     
-    # Search for custom terms
-    if custom_terms:
-        custom_patterns = {term: re.escape(term) for term in custom_terms}
-        results['custom_searches'] = find_matches(text, custom_patterns)
+    for group, contexts in category_matches.items():
+        if contexts:
+            section, level, key, _ = CATEGORY_GROUPS[group]
+            bucket = results[section][level] if level else results[section]
+            bucket[key] = contexts
+    results['custom_searches'] = {term: contexts for term, contexts in custom_matches.items() if contexts}
+    results['deadlines'] = deadlines
     
     # Calculate statistics
     results['statistics'] = {
-        'total_pages': text.count('\n') // 50,  # Rough estimate
-        'word_count': len(text.split()),
+        'total_pages': line_count // 50,  # Rough estimate
+        'word_count': word_count,
         'risk_count': sum(len(risks) for level in results['risks'].values() for risks in level.values()),
         'instruction_count': sum(len(instr) for instr in results['instructions'].values()),
     }
     
     return results
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def analyze_document_cached(texts: Tuple[str, ...], custom_terms: Tuple[str, ...]) -> Dict:
+    """Analyze documents, reusing the previous result for unchanged texts and terms"""
+    return analyze_document_chunks(texts, list(custom_terms))
+
+def items_frame(groups: Dict, columns: List[str]) -> pd.DataFrame:
+    """Flatten lists of items into one row per item, with the group key (or key tuple) as the leading columns"""
+    if not groups:
+        return pd.DataFrame(columns=columns)
+    items = pd.Series(groups, dtype=object).explode()
+    df = items.index.set_names(columns[:-1]).to_frame(index=False)
+    df[columns[-1]] = items.to_numpy()
+    return df
+
+def column_widths(df: pd.DataFrame) -> List[int]:
+    """Get Excel column widths that fit each column's header and values"""
+    return [
+        min(max(len(str(column)), int(df[column].astype(str).str.len().max())) + 2, 50)
+        for column in df.columns
+    ]
+
+def write_sheet(writer: pd.ExcelWriter, df: pd.DataFrame, sheet_name: str):
+    """Write a DataFrame to its own sheet, sized to fit its contents"""
+    workbook = writer.book
+    worksheet = workbook.add_worksheet(sheet_name)
+    for i, width in enumerate(column_widths(df)):
+        worksheet.set_column(i, i, width)
+    # In constant_memory mode each row is flushed to disk once a later row is
+    # written, so rows must go out in order; DataFrame.to_excel writes column
+    # by column and would lose cells
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, df.columns, header_format)
+    for row, values in enumerate(df.itertuples(index=False), start=1):
+        worksheet.write_row(row, 0, values)
+
 def create_excel_report(results: Dict) -> bytes:
     """Create Excel report from analysis results"""
     output = io.BytesIO()
     
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'constant_memory': True}}) as writer:
         # Summary sheet
         summary_data = {
             'Metric': ['Total Word Count', 'Estimated Pages', 'Total Risks Identified', 
@@ -235,83 +543,53 @@ def create_excel_report(results: Dict) -> bytes:
             ]
         }
         summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        write_sheet(writer, summary_df, 'Summary')
         
         # Instructions sheet
-        instruction_rows = []
-        for category, items in results['instructions'].items():
-            for item in items:
-                instruction_rows.append({
-                    'Category': category.replace('_', ' ').title(),
-                    'Instruction': item
-                })
-        if instruction_rows:
-            instructions_df = pd.DataFrame(instruction_rows)
-            instructions_df.to_excel(writer, sheet_name='Instructions', index=False)
+        instructions_df = items_frame(
+            {category.replace('_', ' ').title(): items for category, items in results['instructions'].items()},
+            ['Category', 'Instruction']
+        )
+        if not instructions_df.empty:
+            write_sheet(writer, instructions_df, 'Instructions')
         
         # Risks sheet
-        risk_rows = []
-        for level in ['high', 'medium', 'low']:
-            for risk_type, items in results['risks'][level].items():
-                for item in items:
-                    risk_rows.append({
-                        'Risk Level': level.upper(),
-                        'Risk Type': risk_type.replace('_', ' ').title(),
-                        'Context': item
-                    })
-        if risk_rows:
-            risks_df = pd.DataFrame(risk_rows)
-            risks_df.to_excel(writer, sheet_name='Risks', index=False)
+        risks_df = items_frame(
+            {(level.upper(), risk_type.replace('_', ' ').title()): items
+             for level in ['high', 'medium', 'low']
+             for risk_type, items in results['risks'][level].items()},
+            ['Risk Level', 'Risk Type', 'Context']
+        )
+        if not risks_df.empty:
+            write_sheet(writer, risks_df, 'Risks')
         
         # Deadlines sheet
         if results['deadlines']:
             deadlines_df = pd.DataFrame({'Deadline Information': results['deadlines']})
-            deadlines_df.to_excel(writer, sheet_name='Deadlines', index=False)
+            write_sheet(writer, deadlines_df, 'Deadlines')
         
         # Federal items sheet (if applicable)
         if results['federal_items']:
-            federal_rows = []
-            for category, items in results['federal_items'].items():
-                for item in items:
-                    federal_rows.append({
-                        'Category': category.replace('_', ' ').title(),
-                        'Reference': item
-                    })
-            if federal_rows:
-                federal_df = pd.DataFrame(federal_rows)
-                federal_df.to_excel(writer, sheet_name='Federal Requirements', index=False)
+            federal_df = items_frame(
+                {category.replace('_', ' ').title(): items for category, items in results['federal_items'].items()},
+                ['Category', 'Reference']
+            )
+            if not federal_df.empty:
+                write_sheet(writer, federal_df, 'Federal Requirements')
         
         # Custom searches sheet
         if results['custom_searches']:
-            custom_rows = []
-            for term, items in results['custom_searches'].items():
-                for item in items:
-                    custom_rows.append({
-                        'Search Term': term,
-                        'Context': item
-                    })
-            if custom_rows:
-                custom_df = pd.DataFrame(custom_rows)
-                custom_df.to_excel(writer, sheet_name='Custom Searches', index=False)
+            custom_df = items_frame(results['custom_searches'], ['Search Term', 'Context'])
+            if not custom_df.empty:
+                write_sheet(writer, custom_df, 'Custom Searches')
         
-        # Format the workbook
-        workbook = writer.book
-        for worksheet in workbook.worksheets:
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-    
     output.seek(0)
     return output.getvalue()
 
+def html_items(items: List[str], css_class: str, prefix: str = "") -> str:
+    """Render result items as escaped HTML divs, so a group is sent in one st.markdown call"""
+    return "".join(f'<div class="{css_class}">{prefix}{html.escape(item)}</div>' for item in items)
+
 def display_html_results(results: Dict):
     """Display results in HTML format"""
     st.markdown("## 📋 Analysis Results")
@@ -337,8 +615,7 @@ def display_html_results(results: Dict):
             for category, items in results['instructions'].items():
                 if items:
                     st.markdown(f"**{category.replace('_', ' ').title()}**")
-                    for item in items:
-                        st.markdown(f'<div class="instruction-item">{item}</div>', unsafe_allow_html=True)
+                    st.markdown(html_items(items, "instruction-item"), unsafe_allow_html=True)
         else:
             st.info("No specific instructions found")
     
@@ -352,8 +629,7 @@ def display_html_results(results: Dict):
             for risk_type, items in results['risks']['high'].items():
                 if items:
                     st.markdown(f"**{risk_type.replace('_', ' ').title()}**")
-                    for item in items:
-                        st.markdown(f'<div class="risk-high">{item}</div>', unsafe_allow_html=True)
+                    st.markdown(html_items(items, "risk-high"), unsafe_allow_html=True)
         
         # Medium risks
         if results['risks']['medium']:
@@ -361,8 +637,7 @@ def display_html_results(results: Dict):
             for risk_type, items in results['risks']['medium'].items():
                 if items:
                     st.markdown(f"**{risk_type.replace('_', ' ').title()}**")
-                    for item in items:
-                        st.markdown(f'<div class="risk-medium">{item}</div>', unsafe_allow_html=True)
+                    st.markdown(html_items(items, "risk-medium"), unsafe_allow_html=True)
         
         # Low risks
         if results['risks']['low']:
@@ -370,8 +645,7 @@ def display_html_results(results: Dict):
             for risk_type, items in results['risks']['low'].items():
                 if items:
                     st.markdown(f"**{risk_type.replace('_', ' ').title()}**")
-                    for item in items:
-                        st.markdown(f'<div class="risk-low">{item}</div>', unsafe_allow_html=True)
+                    st.markdown(html_items(items, "risk-low"), unsafe_allow_html=True)
         
         if not any(results['risks'].values()):
             st.info("No specific risks identified")
@@ -380,8 +654,7 @@ def display_html_results(results: Dict):
     with tabs[2]:
         st.markdown("### Important Deadlines")
         if results['deadlines']:
-            for deadline in results['deadlines']:
-                st.markdown(f'<div class="deadline-alert">📅 {deadline}</div>', unsafe_allow_html=True)
+            st.markdown(html_items(results['deadlines'], "deadline-alert", "📅 "), unsafe_allow_html=True)
         else:
             st.info("No specific deadlines found")
     
@@ -392,8 +665,7 @@ def display_html_results(results: Dict):
             for category, items in results['federal_items'].items():
                 if items:
                     st.markdown(f"**{category.replace('_', ' ').title()}**")
-                    for item in items:
-                        st.markdown(f"- {item}")
+                    st.markdown("\n".join(f"- {item}" for item in items))
         else:
             st.info("No federal-specific requirements identified")
     
@@ -404,8 +676,7 @@ def display_html_results(results: Dict):
             for term, items in results['custom_searches'].items():
                 if items:
                     st.markdown(f"**Search term: '{term}'**")
-                    for item in items:
-                        st.markdown(f"- {item}")
+                    st.markdown("\n".join(f"- {item}" for item in items))
         else:
             st.info("No custom search terms provided or no matches found")
 
@@ -488,23 +759,30 @@ def main():
         # Analyze button
         if st.button("🔍 Analyze Documents", type="primary", use_container_width=True):
             with st.spinner("Analyzing documents... This may take a moment."):
-                all_text = ""
+                texts = []
                 
-                # Extract text from all uploaded files
+                # Extract text from the uploaded files in a thread pool; workers
+                # get this session's context so they can report errors. DOCX
+                # files run in parallel, but PDFs are parsed one at a time
+                # under PDFIUM_LOCK since PDFium is not thread-safe
                 progress = st.progress(0)
-                for i, file in enumerate(uploaded_files):
-                    progress.progress((i + 1) / len(uploaded_files))
-                    
-                    if file.type == "application/pdf":
-                        text = extract_text_from_pdf(file)
-                    else:  # DOCX
-                        text = extract_text_from_docx(file)
-                    
-                    all_text += f"\n\n--- Document: {file.name} ---\n\n" + text
+                with ThreadPoolExecutor(
+                    max_workers=min(8, len(uploaded_files)),
+                    initializer=add_script_run_ctx,
+                    initargs=(None, get_script_run_ctx())
+                ) as executor:
+                    extracted = executor.map(
+                        extract_text,
+                        [file.getvalue() for file in uploaded_files],
+                        [file.type for file in uploaded_files]
+                    )
+                    for i, text in enumerate(extracted):
+                        progress.progress((i + 1) / len(uploaded_files))
+                        texts.append(text)
                 
-                # Perform analysis
-                if all_text.strip():
-                    results = analyze_document(all_text, st.session_state.custom_terms)
+                # Perform analysis; each document is scanned on its own
+                if any(text.strip() for text in texts):
+                    results = analyze_document_cached(tuple(texts), tuple(st.session_state.custom_terms))
                     st.session_state.analysis_results = results
                     st.success("✅ Analysis complete!")
                 else: